@@ -0,0 +1,49 @@
+"""Run the Metacritic, RAWG and Steam cleaners in parallel, one process each.
+
+Usage:
+  python src/clean_all.py [--reconcile]
+
+The cleaners share no state: each reads its own input and writes its own
+partial output, final CSV and log file, so they can run side by side.
+Exits non-zero if any cleaner failed.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import clean_metacritic
+import clean_rawg
+import clean_steam
+
+CLEANERS = [clean_metacritic.main, clean_rawg.main, clean_steam.main]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run every cleaner; returns 0 if all succeeded and 1 otherwise."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--reconcile", action="store_true", help="Pass --reconcile to every cleaner")
+    args = p.parse_args(argv)
+
+    cleaner_argv = ["--reconcile"] if args.reconcile else []
+    failed = []
+    with ProcessPoolExecutor(max_workers=len(CLEANERS)) as ex:
+        futures = {fn.__module__: ex.submit(fn, cleaner_argv) for fn in CLEANERS}
+        for name, f in futures.items():
+            try:
+                status = f.result()
+            except Exception as e:
+                print(f"{name} crashed: {e!r}")
+                status = 1
+            if status:
+                failed.append(name)
+    if failed:
+        print("Cleaning failed for:", ", ".join(failed))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
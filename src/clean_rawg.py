@@ -1,105 +1,103 @@
 """Cleaning script for RAWG data with interruption-proofing and logging.
 
 Writes `data/processed/rawg_cleaned.csv`. If interrupted the script will
-resume from a partial file `*.inprogress` and will log errors to
-`logs/clean_rawg.log`.
+resume from the Parquet part files under `*.parts/` and will log
+errors to `logs/clean_rawg.log`.
 """
 from __future__ import annotations
 
+import argparse
 import logging
 import os
+import shutil
+import sys
 import traceback
 from datetime import date
-from typing import Optional
+from typing import List, Optional
 
 import pandas as pd
 
 from clean_utils import (
-    ensure_dir_for_file,
-    join_list_field,
-    parse_date_safe,
-    parse_list_field,
-    within_window,
+    SeenKeys,
+    close_logger,
+    export_parts_csv,
+    hash_key_rows,
+    iter_csv_chunks,
+    parse_date_series,
+    part_paths,
+    read_parts,
+    setup_logger,
+    vector_normalize_list,
+    write_part,
 )
 
 
 INPUT_CSV = "data/RAWG/rawg_data.csv"
 INPUT_JSON = "data/RAWG/rawg_data.json"
 OUT_CSV = "data/processed/rawg_cleaned.csv"
-OUT_PART = OUT_CSV + ".inprogress"
+# partial output: a directory of Parquet part files, one per processed chunk
+OUT_PART_DIR = OUT_CSV + ".parts"
 LOG_PATH = "logs/clean_rawg.log"
+LOG_EVERY_CHUNKS = 50
+# low-cardinality columns held as categoricals in memory
+CATEGORY_COLS = ["esrb"]
+# columns identifying a row for de-duplication
+KEY_COLS = ["name", "release_date"]
 
 
-def setup_logger() -> logging.Logger:
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
-    logger = logging.getLogger("clean_rawg")
-    logger.setLevel(logging.INFO)
-    fh = logging.FileHandler(LOG_PATH)
-    fh.setLevel(logging.INFO)
-    formatter = logging.Formatter("%(asctime)s %(levelname)s: %(message)s")
-    fh.setFormatter(formatter)
-    if not logger.handlers:
-        logger.addHandler(fh)
-    return logger
-
-
-def process_chunks(logger: logging.Logger) -> None:
+def process_chunks(logger: logging.Logger, reconcile: bool = False) -> None:
     if not os.path.exists(INPUT_CSV) and not os.path.exists(INPUT_JSON):
         raise FileNotFoundError("No RAWG data found. Run src/rawg_scraper.py first.")
 
     # Determine already-processed keys (name||release_date) to skip on resume
-    seen = set()
-    if os.path.exists(OUT_PART):
+    seen = SeenKeys()
+    if part_paths(OUT_PART_DIR):
         try:
-            df_seen = pd.read_csv(OUT_PART, dtype=str)
+            df_seen = read_parts(OUT_PART_DIR, columns=KEY_COLS)
             if "name" in df_seen.columns:
-                seen = set((df_seen["name"].fillna("") + "||" + df_seen.get("release_date", "").fillna("")).tolist())
-                logger.info("Resuming: found %d already-processed rows in %s", len(seen), OUT_PART)
+                seen.add(hash_key_rows(df_seen, KEY_COLS))
+                logger.info("Resuming: found %d already-processed rows in %s", len(seen), OUT_PART_DIR)
         except Exception:
             logger.warning("Could not read existing partial output; will reprocess everything")
-            seen = set()
+            # drop the unreadable parts so their rows are not exported a second time
+            shutil.rmtree(OUT_PART_DIR, ignore_errors=True)
+            seen = SeenKeys()
 
-    chunk_iter = pd.read_csv(INPUT_CSV, dtype=str, chunksize=500) if os.path.exists(INPUT_CSV) else pd.read_json(INPUT_JSON, lines=False)
+    chunk_iter = iter_csv_chunks(INPUT_CSV) if os.path.exists(INPUT_CSV) else [pd.read_json(INPUT_JSON, lines=False)]
     total_written = 0
-    header_written = os.path.exists(OUT_PART)
     start = date(2024, 11, 11)
     end = date(2025, 11, 11)
 
-    for chunk in chunk_iter:
+    for chunk_idx, chunk in enumerate(chunk_iter):
         try:
-            # Ensure strings
-            chunk = chunk.astype(object).where(pd.notnull(chunk), None)
-
-            # Build key and skip already processed
+            # The dedup key needs a name
             if "name" not in chunk.columns:
                 logger.warning("Chunk missing 'name' column, skipping chunk")
                 continue
-            key_series = chunk["name"].fillna("") + "||" + chunk.get("release_date", "").fillna("")
-            mask_new = ~key_series.isin(seen)
-            chunk = chunk[mask_new]
+
+            # Parse release_date to ISO and filter by window in one vectorized pass
+            dt = parse_date_series(chunk["release_date"])
+            mask = (dt >= pd.Timestamp(start)) & (dt < pd.Timestamp(end) + pd.Timedelta(days=1))
+            chunk = chunk.loc[mask].copy()
+            chunk["release_date"] = dt[mask].dt.strftime("%Y-%m-%d")
+            if chunk.empty:
+                continue
+
+            # Hash the normalized key once; skip rows already written or repeated in this chunk
+            keys = hash_key_rows(chunk, KEY_COLS)
+            new = seen.unseen(keys)
+            chunk, keys = chunk[new], keys[new]
             if chunk.empty:
                 continue
 
             # Normalize list-like columns
             for col in ["genres", "tags", "platforms"]:
                 if col in chunk.columns:
-                    chunk[col] = chunk[col].fillna("").apply(parse_list_field).apply(lambda lst: join_list_field(lst))
-
-            # Parse release_date to ISO
-            def _fmt_date(v):
-                dt = parse_date_safe(v)
-                return dt.date().isoformat() if dt else ""
-
-            chunk["release_date"] = chunk.get("release_date", "").apply(_fmt_date)
-
-            # Filter by window
-            chunk = chunk[chunk["release_date"].apply(lambda s: within_window(parse_date_safe(s), start, end))]
-            if chunk.empty:
-                continue
+                    chunk[col] = vector_normalize_list(chunk[col])
 
             # Fill missing ESRB
             if "esrb" in chunk.columns:
-                chunk["esrb"] = chunk["esrb"].fillna("Unknown").astype(str).str.strip()
+                chunk["esrb"] = chunk["esrb"].fillna("Unknown").astype(str).str.strip().astype("category")
 
             # Select columns for Tableau-friendly output
             output_cols = [
@@ -121,44 +119,47 @@ def process_chunks(logger: logging.Logger) -> None:
                 logger.warning("No expected columns present in chunk; skipping")
                 continue
 
-            ensure_dir_for_file(OUT_PART)
-            # Append to partial file
-            chunk.to_csv(OUT_PART, mode="a", index=False, header=not header_written, columns=output_cols)
-            header_written = True
+            # Append a part file to the partial output
+            write_part(chunk, OUT_PART_DIR, output_cols)
 
             # Update seen keys
-            seen.update((chunk["name"].fillna("") + "||" + chunk.get("release_date", "").fillna("")).tolist())
+            seen.add(keys)
             total_written += len(chunk)
-            logger.info("Wrote %d rows (total_written=%d)", len(chunk), total_written)
+            # per-chunk progress is DEBUG; every LOG_EVERY_CHUNKS-th chunk is logged at INFO
+            level = logging.INFO if chunk_idx % LOG_EVERY_CHUNKS == 0 else logging.DEBUG
+            logger.log(level, "Wrote %d rows (total_written=%d)", len(chunk), total_written)
         except Exception:
             logger.error("Error processing chunk: %s", traceback.format_exc())
             raise
 
-    # Finalize: dedupe and move to final CSV
-    if os.path.exists(OUT_PART):
-        df_final = pd.read_csv(OUT_PART, dtype=str)
-        # Drop duplicates by name+release_date
-        if "name" in df_final.columns:
-            keycols = [c for c in ["name", "release_date"] if c in df_final.columns]
-            df_final = df_final.drop_duplicates(subset=keycols)
-        ensure_dir_for_file(OUT_CSV)
-        df_final.to_csv(OUT_CSV, index=False)
-        logger.info("Finalized cleaned RAWG CSV to %s (%d rows)", OUT_CSV, len(df_final))
-        # remove partial
+    # Finalize: rows are unique by KEY_COLS already, so the parts are streamed
+    # straight into the final CSV; --reconcile re-runs a global de-duplication
+    if part_paths(OUT_PART_DIR):
+        n_rows = export_parts_csv(OUT_PART_DIR, OUT_CSV, dedup_cols=KEY_COLS if reconcile else None)
+        logger.info("Finalized cleaned RAWG CSV to %s (%d rows)", OUT_CSV, n_rows)
         try:
-            os.remove(OUT_PART)
+            shutil.rmtree(OUT_PART_DIR)
         except Exception:
-            logger.warning("Could not remove partial file %s", OUT_PART)
+            logger.warning("Could not remove partial output %s", OUT_PART_DIR)
+
 
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the cleaner; returns 0 on success and 1 if cleaning failed."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--reconcile", action="store_true", help="De-duplicate all partial output again when finalizing (recovery)")
+    args = p.parse_args(argv)
 
-def main() -> None:
-    logger = setup_logger()
+    logger = setup_logger("clean_rawg", LOG_PATH)
     try:
-        process_chunks(logger)
+        process_chunks(logger, reconcile=args.reconcile)
     except Exception:
         logger.error("Cleaning failed: %s", traceback.format_exc())
         print("Cleaning failed: see", LOG_PATH)
+        return 1
+    finally:
+        close_logger(logger)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -1,118 +1,124 @@
 """Cleaning script for Steam data with interruption-proofing and logging.
 
-Writes `data/processed/steam_cleaned.csv`. Resumes from partial output
-and logs to `logs/clean_steam.log` on errors.
+Writes `data/processed/steam_cleaned.csv`. Resumes from the Parquet part
+files under `*.parts/` and logs to `logs/clean_steam.log` on errors.
 """
 from __future__ import annotations
 
+import argparse
 import logging
 import os
+import shutil
+import sys
 import traceback
 from datetime import date
+from typing import List, Optional
 
 import pandas as pd
 
-from clean_utils import ensure_dir_for_file, join_list_field, parse_date_safe, parse_list_field, within_window
+from clean_utils import SeenKeys, close_logger, export_parts_csv, hash_key_rows, iter_csv_chunks, parse_date_series, part_paths, read_parts, setup_logger, vector_normalize_list, write_part
 
 
 INPUT = "data/steam2025/bestSelling_games.csv"
 OUT = "data/processed/steam_cleaned.csv"
-OUT_PART = OUT + ".inprogress"
+# partial output: a directory of Parquet part files, one per processed chunk
+OUT_PART_DIR = OUT + ".parts"
 LOG_PATH = "logs/clean_steam.log"
+LOG_EVERY_CHUNKS = 50
+# low-cardinality columns held as categoricals in memory
+CATEGORY_COLS = ["supported_os"]
+# columns identifying a row for de-duplication
+KEY_COLS = ["game_name", "release_date"]
 
 
-def setup_logger() -> logging.Logger:
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
-    logger = logging.getLogger("clean_steam")
-    logger.setLevel(logging.INFO)
-    fh = logging.FileHandler(LOG_PATH)
-    fh.setLevel(logging.INFO)
-    formatter = logging.Formatter("%(asctime)s %(levelname)s: %(message)s")
-    fh.setFormatter(formatter)
-    if not logger.handlers:
-        logger.addHandler(fh)
-    return logger
-
-
-def process(logger: logging.Logger) -> None:
+def process(logger: logging.Logger, reconcile: bool = False) -> None:
     if not os.path.exists(INPUT):
         raise FileNotFoundError(f"Steam input not found: {INPUT}")
 
-    seen = set()
-    if os.path.exists(OUT_PART):
+    seen = SeenKeys()
+    if part_paths(OUT_PART_DIR):
         try:
-            df_seen = pd.read_csv(OUT_PART, dtype=str)
-            seen = set((df_seen.get("game_name", "").fillna("") + "||" + df_seen.get("release_date", "").fillna("")).tolist())
+            df_seen = read_parts(OUT_PART_DIR, columns=KEY_COLS)
+            seen.add(hash_key_rows(df_seen, KEY_COLS))
             logger.info("Resuming steam cleaning; %d rows already present", len(seen))
         except Exception:
             logger.warning("Could not read existing partial output; will reprocess everything")
-            seen = set()
+            # drop the unreadable parts so their rows are not exported a second time
+            shutil.rmtree(OUT_PART_DIR, ignore_errors=True)
+            seen = SeenKeys()
 
     total_written = 0
-    header_written = os.path.exists(OUT_PART)
     start = date(2024, 11, 11)
     end = date(2025, 11, 11)
 
-    for chunk in pd.read_csv(INPUT, dtype=str, chunksize=500):
+    for chunk_idx, chunk in enumerate(iter_csv_chunks(INPUT)):
         try:
-            chunk = chunk.astype(object).where(pd.notnull(chunk), None)
-            key_series = chunk.get("game_name", "").fillna("") + "||" + chunk.get("release_date", "").fillna("")
-            chunk = chunk[~key_series.isin(seen)]
+            # parse release_date to ISO and filter by window in one vectorized pass
+            dt = parse_date_series(chunk["release_date"])
+            mask = (dt >= pd.Timestamp(start)) & (dt < pd.Timestamp(end) + pd.Timedelta(days=1))
+            chunk = chunk.loc[mask].copy()
+            chunk["release_date"] = dt[mask].dt.strftime("%Y-%m-%d")
+            if chunk.empty:
+                continue
+
+            # hash the normalized key once; skip rows already written or repeated in this chunk
+            keys = hash_key_rows(chunk, KEY_COLS)
+            new = seen.unseen(keys)
+            chunk, keys = chunk[new], keys[new]
             if chunk.empty:
                 continue
 
             if "user_defined_tags" in chunk.columns:
-                chunk["user_defined_tags"] = chunk["user_defined_tags"].fillna("").apply(parse_list_field).apply(lambda l: join_list_field(l))
+                chunk["user_defined_tags"] = vector_normalize_list(chunk["user_defined_tags"])
 
             if "supported_os" in chunk.columns:
-                chunk["supported_os"] = chunk["supported_os"].fillna("").apply(parse_list_field).apply(lambda l: join_list_field(l))
+                chunk["supported_os"] = vector_normalize_list(chunk["supported_os"])
 
-            # parse release_date to ISO
-            def _fmt(v):
-                dt = parse_date_safe(v)
-                return dt.date().isoformat() if dt else ""
+            for c in CATEGORY_COLS:
+                if c in chunk.columns:
+                    chunk[c] = chunk[c].astype("category")
 
-            chunk["release_date"] = chunk.get("release_date", "").apply(_fmt)
-            chunk = chunk[chunk["release_date"].apply(lambda s: within_window(parse_date_safe(s), start, end))]
-            if chunk.empty:
-                continue
-
-            ensure_dir_for_file(OUT_PART)
             # keep estimated_downloads and reviews_like_rate if present for sales/ranking analysis
             out_cols = [c for c in ["game_name", "release_date", "developer", "user_defined_tags", "supported_os", "price", "estimated_downloads", "reviews_like_rate"] if c in chunk.columns]
-            chunk.to_csv(OUT_PART, mode="a", index=False, header=not header_written, columns=out_cols)
-            header_written = True
+            write_part(chunk, OUT_PART_DIR, out_cols)
 
-            seen.update((chunk.get("game_name", "").fillna("") + "||" + chunk.get("release_date", "").fillna("")).tolist())
+            seen.add(keys)
             total_written += len(chunk)
-            logger.info("Wrote %d rows (total_written=%d)", len(chunk), total_written)
+            # per-chunk progress is DEBUG; every LOG_EVERY_CHUNKS-th chunk is logged at INFO
+            level = logging.INFO if chunk_idx % LOG_EVERY_CHUNKS == 0 else logging.DEBUG
+            logger.log(level, "Wrote %d rows (total_written=%d)", len(chunk), total_written)
         except Exception:
             logger.error("Error processing chunk: %s", traceback.format_exc())
             raise
 
-    # finalize
-    if os.path.exists(OUT_PART):
-        df_final = pd.read_csv(OUT_PART, dtype=str)
-        dedup_cols = [c for c in ["game_name", "release_date"] if c in df_final.columns]
-        if dedup_cols:
-            df_final = df_final.drop_duplicates(subset=dedup_cols)
-        ensure_dir_for_file(OUT)
-        df_final.to_csv(OUT, index=False)
-        logger.info("Finalized steam cleaned CSV to %s (%d rows)", OUT, len(df_final))
+    # finalize: rows are unique by KEY_COLS already, so the parts are streamed
+    # straight into the final CSV; --reconcile re-runs a global de-duplication
+    if part_paths(OUT_PART_DIR):
+        n_rows = export_parts_csv(OUT_PART_DIR, OUT, dedup_cols=KEY_COLS if reconcile else None)
+        logger.info("Finalized steam cleaned CSV to %s (%d rows)", OUT, n_rows)
         try:
-            os.remove(OUT_PART)
+            shutil.rmtree(OUT_PART_DIR)
         except Exception:
-            logger.warning("Could not remove partial file %s", OUT_PART)
+            logger.warning("Could not remove partial output %s", OUT_PART_DIR)
+
 
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the cleaner; returns 0 on success and 1 if cleaning failed."""
+    p = argparse.ArgumentParser()
+    p.add_argument("--reconcile", action="store_true", help="De-duplicate all partial output again when finalizing (recovery)")
+    args = p.parse_args(argv)
 
-def main() -> None:
-    logger = setup_logger()
+    logger = setup_logger("clean_steam", LOG_PATH)
     try:
-        process(logger)
+        process(logger, reconcile=args.reconcile)
     except Exception:
         logger.error("Cleaning failed: %s", traceback.format_exc())
         print("Cleaning failed: see", LOG_PATH)
+        return 1
+    finally:
+        close_logger(logger)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
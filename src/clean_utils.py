@@ -2,20 +2,221 @@
 from __future__ import annotations
 
 import ast
+import atexit
+import csv
+import logging
 import os
-from datetime import datetime, date
-from typing import Any, Iterable, List, Optional
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 from dateutil import parser as dparser
 
 
+_log_listeners: Dict[str, QueueListener] = {}
+
+
 def ensure_dir_for_file(path: str) -> None:
     d = os.path.dirname(path)
     if d:
         os.makedirs(d, exist_ok=True)
 
 
+def setup_logger(name: str, log_path: str) -> logging.Logger:
+    """Return logger ``name`` writing INFO and above to ``log_path``.
+
+    File writes happen on a QueueListener thread, off the chunk loop. Call
+    ``close_logger`` when done; process-pool workers exit without running
+    atexit hooks, so queued records would otherwise be lost.
+    """
+    ensure_dir_for_file(log_path)
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        fh = logging.FileHandler(log_path)
+        fh.setLevel(logging.INFO)
+        formatter = logging.Formatter("%(asctime)s %(levelname)s: %(message)s")
+        fh.setFormatter(formatter)
+        log_queue: queue.Queue = queue.Queue(-1)
+        listener = QueueListener(log_queue, fh, respect_handler_level=True)
+        listener.start()
+        _log_listeners[name] = listener
+        atexit.register(close_logger, logger)
+        logger.addHandler(QueueHandler(log_queue))
+    return logger
+
+
+def close_logger(logger: logging.Logger) -> None:
+    """Flush and detach the handlers installed by ``setup_logger``."""
+    listener = _log_listeners.pop(logger.name, None)
+    if listener is None:
+        return
+    listener.stop()
+    for h in listener.handlers:
+        h.close()
+    for h in list(logger.handlers):
+        logger.removeHandler(h)
+
+
+def iter_csv_chunks(path: str, block_size: int = 64 << 20) -> Iterator[pd.DataFrame]:
+    """Stream ``path`` as DataFrames of ``block_size``-byte blocks using pyarrow's CSV reader.
+
+    Every column is read as a string and empty fields become nulls, matching
+    ``pd.read_csv(dtype=str)``; quoted values may span lines.
+    """
+    # utf-8-sig drops a leading BOM so the names match the ones pyarrow reads
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        header = next(csv.reader(fh), [])
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(column_types={c: pa.string() for c in header}, strings_can_be_null=True),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def part_paths(part_dir: str) -> List[str]:
+    """Return the Parquet part files in ``part_dir`` in the order they were written."""
+    if not os.path.isdir(part_dir):
+        return []
+    return sorted(os.path.join(part_dir, f) for f in os.listdir(part_dir) if f.endswith(".parquet"))
+
+
+def write_part(df: pd.DataFrame, part_dir: str, columns: List[str]) -> str:
+    """Write ``df[columns]`` as the next numbered Parquet part file in ``part_dir``."""
+    os.makedirs(part_dir, exist_ok=True)
+    table = pa.Table.from_pandas(df[columns], preserve_index=False)
+    # pin every column to string (categoricals to dictionary<int32, string>) so
+    # all-null chunks don't write a ``null`` type and every part shares one schema
+    for i, c in enumerate(columns):
+        if isinstance(df[c].dtype, pd.CategoricalDtype):
+            target = pa.dictionary(pa.int32(), pa.string())
+        else:
+            target = pa.string()
+        if table.schema.field(i).type != target:
+            table = table.set_column(i, c, table.column(i).cast(target))
+    path = os.path.join(part_dir, f"part-{len(part_paths(part_dir)):06d}.parquet")
+    # write under a temporary name so an interrupted write never leaves a truncated part
+    tmp_path = path + ".tmp"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_parts(part_dir: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Read the Parquet parts in ``part_dir`` back as one DataFrame.
+
+    ``columns`` restricts the read to those columns; names missing from the
+    parts are ignored.
+    """
+    dataset = ds.dataset(part_paths(part_dir), format="parquet")
+    if columns is not None:
+        columns = [c for c in columns if c in dataset.schema.names]
+    return dataset.to_table(columns=columns).to_pandas()
+
+
+def export_parts_csv(part_dir: str, out_path: str, dedup_cols: Optional[List[str]] = None) -> int:
+    """Write the Parquet parts in ``part_dir`` to ``out_path`` as one CSV; returns the row count.
+
+    Parts are streamed one at a time through a single ``csv.writer`` into a
+    temporary file that is then renamed over ``out_path``. With ``dedup_cols`` every part is loaded and
+    de-duplicated on those columns first, for output whose dedup state
+    cannot be trusted.
+    """
+    ensure_dir_for_file(out_path)
+    tmp_path = out_path + ".tmp"
+    if dedup_cols:
+        df = read_parts(part_dir)
+        df = df.drop_duplicates(subset=[c for c in dedup_cols if c in df.columns])
+        df.to_csv(tmp_path, index=False)
+        n = len(df)
+    else:
+        n = 0
+        # one buffered handle for every part; the header is written once from the first part
+        with open(tmp_path, "w", newline="", encoding="utf-8", buffering=1 << 20) as fh:
+            writer = csv.writer(fh, lineterminator="\n")
+            for i, path in enumerate(part_paths(part_dir)):
+                table = pq.read_table(path)
+                if i == 0:
+                    writer.writerow(table.column_names)
+                writer.writerows(zip(*(col.to_pylist() for col in table.columns)))
+                n += table.num_rows
+    os.replace(tmp_path, out_path)
+    return n
+
+
+def hash_key_rows(df: pd.DataFrame, cols: List[str]) -> np.ndarray:
+    """Return one uint64 hash per row over ``cols``; missing columns and nulls hash as ""."""
+    empty = pd.Series("", index=df.index, dtype=object)
+    keys = {}
+    for c in cols:
+        col = df[c] if c in df.columns else empty
+        # only columns that actually hold nulls are copied to fill them
+        if col.hasnans:
+            col = col.astype(object).fillna("")
+        keys[c] = col
+    return pd.util.hash_pandas_object(pd.DataFrame(keys, copy=False), index=False).to_numpy()
+
+
+class SeenKeys:
+    """Set of already-written row hashes used to skip duplicates across chunks.
+
+    A bitmap indexed by the top bits of each hash answers most probes with a
+    single numpy lookup; bitmap hits are confirmed against the exact hashes so
+    false positives never drop a row.
+    """
+
+    def __init__(self, bits_log2: int = 24) -> None:
+        self._bits = np.zeros(1 << bits_log2, dtype=np.uint8)
+        self._shift = np.uint64(64 - bits_log2)
+        self._exact: set = set()
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def _slots(self, hashes: np.ndarray):
+        idx = (hashes >> self._shift).astype(np.intp)
+        bit = np.left_shift(np.uint8(1), (hashes & np.uint64(7)).astype(np.uint8))
+        return idx, bit
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        idx, bit = self._slots(hashes)
+        hit = (self._bits[idx] & bit) != 0
+        if hit.any():
+            hit[hit] = [h in self._exact for h in hashes[hit].tolist()]
+        return hit
+
+    def unseen(self, hashes: np.ndarray) -> np.ndarray:
+        """Mask of rows neither already seen nor repeating an earlier row in ``hashes``."""
+        return ~self.contains(hashes) & ~pd.Series(hashes).duplicated().to_numpy()
+
+    def add(self, hashes: np.ndarray) -> None:
+        idx, bit = self._slots(hashes)
+        np.bitwise_or.at(self._bits, idx, bit)
+        self._exact.update(hashes.tolist())
+
+
+# list separators in precedence order: a value is split on the first one it contains
+_LIST_SEPS = ("|", ",", ";")
+
+
+def _tokenize_delim(s: str) -> List[str]:
+    """Split ``s`` on the first separator present, checked in ``_LIST_SEPS`` order."""
+    for sep in _LIST_SEPS:
+        if sep in s:
+            return [x.strip() for x in s.split(sep) if x.strip()]
+    return [s] if s else []
+
+
 def parse_list_field(val: Any) -> List[str]:
     """Normalize a field that may be a list, a stringified list, or a delimited string.
 
@@ -27,20 +228,16 @@ def parse_list_field(val: Any) -> List[str]:
         return [str(x).strip() for x in val if x is not None]
     if isinstance(val, str):
         s = val.strip()
-        # try list literal
-        if s.startswith("[") and s.endswith("]"):
+        # plain delimited strings skip the literal parser entirely
+        if s[:1] != "[":
+            return _tokenize_delim(s)
+        if s.endswith("]"):
             try:
                 arr = ast.literal_eval(s)
                 return [str(x).strip() for x in arr if x is not None]
             except Exception:
                 pass
-        # common separators
-        for sep in ["|", ",", ";"]:
-            if sep in s:
-                return [x.strip() for x in s.split(sep) if x.strip()]
-        if s == "":
-            return []
-        return [s]
+        return _tokenize_delim(s)
     # fallback
     return [str(val)]
 
@@ -49,6 +246,40 @@ def join_list_field(lst: Iterable[str], sep: str = "|") -> str:
     return sep.join([str(x).strip() for x in lst if x is not None and str(x).strip()])
 
 
+def vector_normalize_list(series: pd.Series, sep: str = "|") -> pd.Series:
+    """Vectorized ``join_list_field(parse_list_field(v))`` over a whole column.
+
+    Plain delimited strings are normalized with ``Series.str`` operations using
+    the same separator precedence as ``parse_list_field``; list literals and
+    columns holding non-string values fall back to the per-value path.
+    """
+    def _slow(v: Any) -> str:
+        return join_list_field(parse_list_field(v), sep=sep)
+
+    s = series.fillna("")
+    if s.empty:
+        return s
+    if not s.map(type).eq(str).all():
+        return s.apply(_slow)
+
+    index = s.index
+    s = s.reset_index(drop=True).str.strip()
+    literal = s.str.startswith("[") & s.str.endswith("]")
+    has_pipe = s.str.contains("|", regex=False)
+    has_comma = ~has_pipe & s.str.contains(",", regex=False)
+    has_semi = ~has_pipe & ~has_comma & s.str.contains(";", regex=False)
+    s = s.mask(has_comma, s.str.replace(",", "|", regex=False))
+    s = s.mask(has_semi, s.str.replace(";", "|", regex=False))
+
+    parts = s.str.split("|").explode().str.strip()
+    parts = parts[parts != ""]
+    out = parts.groupby(level=0).agg(sep.join).reindex(s.index, fill_value="")
+    if literal.any():
+        out[literal] = series.reset_index(drop=True)[literal].map(_slow)
+    out.index = index
+    return out
+
+
 def parse_date_safe(val: Any) -> Optional[datetime]:
     if val is None or (isinstance(val, float) and pd.isna(val)):
         return None
@@ -58,7 +289,20 @@ def parse_date_safe(val: Any) -> Optional[datetime]:
         return None
 
 
-def within_window(dt: Optional[datetime], start: date, end: date) -> bool:
-    if dt is None:
-        return False
-    return start <= dt.date() <= end
+def parse_date_series(series: pd.Series) -> pd.Series:
+    """Parse ``series`` to naive datetimes in one vectorized pass; bad values become NaT.
+
+    Like :func:`parse_date_safe`, a UTC offset is dropped and the wall-clock
+    time kept. pandas refuses to parse mixed offsets together even with
+    ``errors="coerce"``, so such a series falls back to :func:`parse_date_safe`
+    once per distinct value.
+    """
+    try:
+        dt = pd.to_datetime(series, errors="coerce", format="mixed")
+    except ValueError:
+        parsed = {v: parse_date_safe(v) for v in series.dropna().unique()}
+        naive = {v: d.replace(tzinfo=None) for v, d in parsed.items() if d is not None}
+        return pd.to_datetime(series.map(naive), errors="coerce")
+    if isinstance(dt.dtype, pd.DatetimeTZDtype):
+        dt = dt.dt.tz_localize(None)
+    return dt
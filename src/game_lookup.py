@@ -11,9 +11,13 @@ from __future__ import annotations
 
 import os
 import sys
-from difflib import get_close_matches
+from functools import lru_cache
+from typing import Dict, List, NamedTuple
 
-import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.dataset as ds
+from rapidfuzz import fuzz, process
 
 DATA_DIR = "data/processed"
 RAWG = os.path.join(DATA_DIR, "rawg_cleaned.csv")
@@ -21,55 +25,86 @@ META = os.path.join(DATA_DIR, "metacritic_cleaned.csv")
 STEAM = os.path.join(DATA_DIR, "steam_cleaned.csv")
 
 
-def load_df(path):
-    if os.path.exists(path):
-        return pd.read_csv(path, dtype=str)
-    return None
+def open_dataset(path):
+    """Open a cleaned CSV as a pyarrow dataset with every column read as a string."""
+    if not os.path.exists(path):
+        return None
+    csv_format = ds.CsvFileFormat(parse_options=pacsv.ParseOptions(newlines_in_values=True))
+    names = ds.dataset(path, format=csv_format).schema.names
+    return ds.dataset(path, format=csv_format, schema=pa.schema([(n, pa.string()) for n in names]))
+
+
+class NameIndex(NamedTuple):
+    dataset: ds.Dataset
+    names_lower: List[str]
+    index_by_lower: Dict[str, int]
+
+
+@lru_cache(maxsize=None)
+def _build_name_index(path, col, mtime):
+    dataset = open_dataset(path)
+    if dataset is None or col not in dataset.schema.names:
+        return None
+    names = dataset.to_table(columns=[col]).column(col).to_pylist()
+    names_lower = [(n or "").strip().lower() for n in names]
+    index_by_lower = {}
+    for i, n in enumerate(names_lower):
+        # keep the first row for repeated names, like the old column scan
+        index_by_lower.setdefault(n, i)
+    return NameIndex(dataset, names_lower, index_by_lower)
+
+
+def load_name_index(path, col):
+    """Return the cached NameIndex for ``col`` in ``path``; rebuilt when the file changes."""
+    if not os.path.exists(path):
+        return None
+    return _build_name_index(path, col, os.path.getmtime(path))
+
+
+def row_at(index, i):
+    return index.dataset.take([i]).to_pylist()[0]
 
 
-def find_game_exact(df, col, name):
-    if df is None or col not in df.columns:
+def find_game_exact(path, col, name):
+    index = load_name_index(path, col)
+    if index is None:
         return None
-    matches = df[df[col].str.strip().str.lower() == name.strip().lower()]
-    if not matches.empty:
-        return matches.iloc[0].to_dict()
+    i = index.index_by_lower.get(name.strip().lower())
+    if i is not None:
+        return row_at(index, i)
     return None
 
 
-def find_game_best(df, col, name):
-    if df is None or col not in df.columns:
+def find_game_best(path, col, name):
+    index = load_name_index(path, col)
+    if index is None or not index.names_lower:
         return None
-    # exact match already checked; try close matches on names
-    names = df[col].fillna("").tolist()
-    close = get_close_matches(name, names, n=3, cutoff=0.7)
-    if close:
-        cand = df[df[col] == close[0]].iloc[0]
-        return cand.to_dict()
+    # exact match already checked; fuzzy match on names
+    match = process.extractOne(name.strip().lower(), index.names_lower, scorer=fuzz.WRatio, score_cutoff=70)
+    if match:
+        return row_at(index, match[2])
     return None
 
 
 def lookup(name: str):
     results = {}
-    rawg_df = load_df(RAWG)
-    meta_df = load_df(META)
-    steam_df = load_df(STEAM)
 
     # RAWG: columns -> name, ratings, metacritic
-    r = find_game_exact(rawg_df, 'name', name) if rawg_df is not None else None
+    r = find_game_exact(RAWG, 'name', name)
     if r is None:
-        r = find_game_best(rawg_df, 'name', name) if rawg_df is not None else None
+        r = find_game_best(RAWG, 'name', name)
     results['RAWG'] = r
 
     # Metacritic: name, metascore, user_score
-    m = find_game_exact(meta_df, 'name', name) if meta_df is not None else None
+    m = find_game_exact(META, 'name', name)
     if m is None:
-        m = find_game_best(meta_df, 'name', name) if meta_df is not None else None
+        m = find_game_best(META, 'name', name)
     results['Metacritic'] = m
 
     # Steam: game_name, estimated_downloads, reviews_like_rate, price
-    s = find_game_exact(steam_df, 'game_name', name) if steam_df is not None else None
+    s = find_game_exact(STEAM, 'game_name', name)
     if s is None:
-        s = find_game_best(steam_df, 'game_name', name) if steam_df is not None else None
+        s = find_game_best(STEAM, 'game_name', name)
     results['Steam'] = s
 
     return results
@@ -9,23 +9,31 @@ Usage:
 
 Supports using an API key via RAWG_API_KEY env var or --api-key. If no key
 is provided the script will still attempt requests but may be rate-limited.
+Detail responses are cached per game under .cache/rawg_detail/ so reruns and
+resumes skip them (see --cache-dir and --no-cache).
 """
 from __future__ import annotations
 
 import argparse
+import asyncio
 import csv
 import json
 import logging
 import os
-import time
+import re
 from datetime import date, datetime
-from typing import Dict, Iterable, List, Optional
+from typing import AsyncIterator, Dict, Iterable, List, Optional
 
-import requests
+import aiohttp
 from dateutil import parser as dparser
 from tqdm import tqdm
 
 RAWG_BASE = "https://api.rawg.io/api"
+# max in-flight detail requests per page
+DETAIL_CONCURRENCY = 8
+# per-slug detail responses reused across runs
+DETAIL_CACHE_DIR = ".cache/rawg_detail"
+ISO_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
 
 logger = logging.getLogger("rawg_scraper")
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
@@ -50,91 +58,174 @@ def in_window(dt: Optional[datetime], start: date, end: date) -> bool:
     return start <= dt.date() <= end
 
 
-def fetch_games_api(start: str, end: str, api_key: Optional[str], page_size: int = 40) -> Iterable[Dict]:
-    """Yield raw game dicts from RAWG list endpoint and fetch details for each game.
+def in_window_iso(s: Optional[str], start_iso: str, end_iso: str) -> bool:
+    """in_window for ``YYYY-MM-DD`` strings: ISO dates order like text, so no parsing."""
+    return bool(s) and start_iso <= s <= end_iso
 
-    The function paginates the list endpoint and then requests the detail
-    endpoint for each game to fetch description and ESRB.
+
+def release_in_window(release: Optional[str], start: date, end: date) -> bool:
+    # RAWG returns ISO dates; anything else goes through the generic parser
+    if release and ISO_DATE_RE.fullmatch(release):
+        return in_window_iso(release, start.isoformat(), end.isoformat())
+    return in_window(parse_iso(release), start, end)
+
+
+def combine_game(r: Dict, detail: Dict) -> Dict:
+    """Merge a list-endpoint result with its detail-endpoint payload."""
+    # Safely extract list-like nested fields, some responses use null
+    genres_list = [g.get("name") for g in (r.get("genres") or []) if g and g.get("name")] or [g.get("name") for g in (detail.get("genres") or []) if g and g.get("name")]
+    tags_list = [t.get("name") for t in (r.get("tags") or []) if t and t.get("name")] or [t.get("name") for t in (detail.get("tags") or []) if t and t.get("name")]
+    platforms_list = [p.get("platform", {}).get("name") for p in (r.get("platforms") or []) if p and p.get("platform")] or [p.get("platform", {}).get("name") for p in (detail.get("platforms") or []) if p and p.get("platform")]
+
+    return {
+        "name": r.get("name"),
+        "release_date": r.get("released") or detail.get("released"),
+        "genres": genres_list,
+        "tags": tags_list,
+        "ratings": r.get("rating") or detail.get("rating"),
+        "platforms": platforms_list,
+        "esrb": (detail.get("esrb_rating") or {}).get("name") if detail.get("esrb_rating") else None,
+        "metacritic": r.get("metacritic") or detail.get("metacritic"),
+        "description": detail.get("description_raw") or detail.get("description") or "",
+        "rawg_slug": r.get("slug"),
+        "rawg_id": r.get("id") or detail.get("id"),
+    }
+
+
+def detail_cache_path(cache_dir: str, slug: str) -> str:
+    return os.path.join(cache_dir, f"{slug}.json")
+
+
+async def fetch_detail(session: aiohttp.ClientSession, sem: asyncio.Semaphore, slug: str, api_key: Optional[str], cache_dir: Optional[str] = None) -> Dict:
+    """Fetch one game's detail payload by slug; returns {} on failure.
+
+    When ``cache_dir`` is set, a cached ``{slug}.json`` is returned without a
+    request and successful responses are written through to it.
+    """
+    if cache_dir:
+        cache_path = detail_cache_path(cache_dir, slug)
+        if os.path.exists(cache_path):
+            try:
+                with open(cache_path, encoding="utf-8") as fh:
+                    return json.load(fh)
+            except Exception as e:
+                logger.warning("Ignoring unreadable cache entry %s (%s)", cache_path, e)
+
+    detail_url = f"{RAWG_BASE}/games/{slug}"
+    detail_params = {}
+    if api_key:
+        detail_params["key"] = api_key
+    async with sem:
+        try:
+            async with session.get(detail_url, params=detail_params, timeout=aiohttp.ClientTimeout(total=20)) as resp:
+                detail = await resp.json(content_type=None)
+                ok = resp.status == 200 and isinstance(detail, dict)
+        except Exception as e:
+            logger.warning("Failed to fetch details for %s (%s)", slug, e)
+            return {}
+
+    if cache_dir and ok:
+        ensure_dir(cache_dir)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fh:
+            json.dump(detail, fh, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    return detail
+
+
+async def fetch_games_api_async(start: str, end: str, api_key: Optional[str], page_size: int = 40, cache_dir: Optional[str] = DETAIL_CACHE_DIR) -> AsyncIterator[Dict]:
+    """Yield combined game dicts, fetching each page's details concurrently.
+
+    The list endpoint is paginated serially; the detail requests for a page
+    (by slug, to get description and ESRB) run together, at most
+    DETAIL_CONCURRENCY at a time. Details are cached per slug under
+    ``cache_dir`` (None disables the cache) so reruns skip those requests.
     """
     params = {"dates": f"{start},{end}", "page_size": page_size}
     if api_key:
         params["key"] = api_key
 
     url = f"{RAWG_BASE}/games"
-    session = requests.Session()
-    page = 1
-    while True:
-        params["page"] = page
-        resp = session.get(url, params=params, timeout=30)
-        if resp.status_code != 200:
-            logger.error("RAWG list request failed %s: %s", resp.status_code, resp.text[:200])
-            break
-        data = resp.json()
-        results = data.get("results", [])
-        if not results:
-            break
-
-        for r in results:
+    sem = asyncio.Semaphore(DETAIL_CONCURRENCY)
+    async with aiohttp.ClientSession() as session:
+        page = 1
+        while True:
+            params["page"] = page
+            async with session.get(url, params=params, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+                if resp.status != 200:
+                    logger.error("RAWG list request failed %s: %s", resp.status, (await resp.text())[:200])
+                    break
+                data = await resp.json(content_type=None)
+            results = data.get("results", [])
+            if not results:
+                break
+
             # fetch details by slug (more reliable) to get description/esrb
-            slug = r.get("slug")
-            if not slug:
-                continue
-            detail_url = f"{RAWG_BASE}/games/{slug}"
-            detail_params = {}
-            if api_key:
-                detail_params["key"] = api_key
+            listed = [r for r in results if r.get("slug")]
+            details = await asyncio.gather(*(fetch_detail(session, sem, r["slug"], api_key, cache_dir) for r in listed))
+            for r, detail in zip(listed, details):
+                yield combine_game(r, detail)
+
+            # pagination
+            if not data.get("next"):
+                break
+            page += 1
+            await asyncio.sleep(0.5)
+
+
+def fetch_games_api(start: str, end: str, api_key: Optional[str], page_size: int = 40, cache_dir: Optional[str] = DETAIL_CACHE_DIR) -> Iterable[Dict]:
+    """Synchronous view of fetch_games_api_async so rows can be streamed to the savers."""
+    loop = asyncio.new_event_loop()
+    agen = fetch_games_api_async(start, end, api_key, page_size=page_size, cache_dir=cache_dir)
+    try:
+        while True:
             try:
-                detail = session.get(detail_url, params=detail_params, timeout=20).json()
-            except Exception as e:
-                logger.warning("Failed to fetch details for %s (%s)", slug, e)
-                detail = {}
-
-            # combine list-level fields and detail fields
-            # Safely extract list-like nested fields, some responses use null
-            genres_list = [g.get("name") for g in (r.get("genres") or []) if g and g.get("name")] or [g.get("name") for g in (detail.get("genres") or []) if g and g.get("name")]
-            tags_list = [t.get("name") for t in (r.get("tags") or []) if t and t.get("name")] or [t.get("name") for t in (detail.get("tags") or []) if t and t.get("name")]
-            platforms_list = [p.get("platform", {}).get("name") for p in (r.get("platforms") or []) if p and p.get("platform")] or [p.get("platform", {}).get("name") for p in (detail.get("platforms") or []) if p and p.get("platform")]
-
-            combined = {
-                "name": r.get("name"),
-                "release_date": r.get("released") or detail.get("released"),
-                "genres": genres_list,
-                "tags": tags_list,
-                "ratings": r.get("rating") or detail.get("rating"),
-                "platforms": platforms_list,
-                "esrb": (detail.get("esrb_rating") or {}).get("name") if detail.get("esrb_rating") else None,
-                "metacritic": r.get("metacritic") or detail.get("metacritic"),
-                "description": detail.get("description_raw") or detail.get("description") or "",
-                "rawg_slug": slug,
-                "rawg_id": r.get("id") or detail.get("id"),
-            }
-            yield combined
-
-        # pagination
-        if not data.get("next"):
-            break
-        page += 1
-        time.sleep(0.5)
-
-
-def save_to_csv(rows: Iterable[Dict], out_path: str, fieldnames: List[str]) -> None:
+                yield loop.run_until_complete(agen.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(agen.aclose())
+        loop.close()
+
+
+def save_to_csv(rows: Iterable[Dict], out_path: str, fieldnames: List[str]) -> int:
+    """Stream ``rows`` to ``out_path`` as they arrive; returns the number written.
+
+    Rows go to a temporary file that replaces ``out_path`` only once every
+    row is written, so a failed scrape leaves the previous file intact.
+    """
     ensure_dir(os.path.dirname(out_path))
-    with open(out_path, "w", newline='', encoding="utf-8") as fh:
+    n = 0
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", newline='', encoding="utf-8", buffering=1 << 20) as fh:
         writer = csv.DictWriter(fh, fieldnames=fieldnames)
         writer.writeheader()
         for r in rows:
             # ensure lists are joined
-            row = dict(r)
-            for k, v in row.items():
-                if isinstance(v, list):
-                    row[k] = "|".join([str(x) for x in v])
+            row = {k: ("|".join([str(x) for x in v]) if isinstance(v, list) else v) for k, v in r.items()}
             writer.writerow(row)
+            n += 1
+    os.replace(tmp_path, out_path)
+    return n
 
 
-def save_to_json(rows: Iterable[Dict], out_path: str) -> None:
+def save_to_json(rows: Iterable[Dict], out_path: str) -> int:
+    """Stream ``rows`` to ``out_path`` as a JSON array; returns the number written.
+
+    Like :func:`save_to_csv`, writes a temporary file and renames it over ``out_path``.
+    """
     ensure_dir(os.path.dirname(out_path))
-    with open(out_path, "w", encoding="utf-8") as fh:
-        json.dump(list(rows), fh, ensure_ascii=False, indent=2)
+    n = 0
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", buffering=1 << 20) as fh:
+        fh.write("[")
+        for r in rows:
+            fh.write(",\n" if n else "\n")
+            fh.write(json.dumps(r, ensure_ascii=False, indent=2))
+            n += 1
+        fh.write("\n]\n" if n else "]\n")
+    os.replace(tmp_path, out_path)
+    return n
 
 
 def main(argv: Optional[List[str]] = None) -> None:
@@ -144,22 +235,23 @@ def main(argv: Optional[List[str]] = None) -> None:
     p.add_argument("--api-key", default=os.environ.get("RAWG_API_KEY"), help="RAWG API key or set RAWG_API_KEY env var")
     p.add_argument("--out", default="data/RAWG/rawg_data.csv", help="Output path (csv or .json)")
     p.add_argument("--page-size", type=int, default=40)
+    p.add_argument("--cache-dir", default=DETAIL_CACHE_DIR, help="Directory caching RAWG detail responses per slug")
+    p.add_argument("--no-cache", action="store_true", help="Always fetch details from the API")
     args = p.parse_args(argv)
 
     start_dt = dparser.parse(args.start).date()
     end_dt = dparser.parse(args.end).date()
 
     logger.info("Fetching RAWG games between %s and %s", start_dt.isoformat(), end_dt.isoformat())
-    fetched = []
-    for g in tqdm(fetch_games_api(args.start, args.end, args.api_key, page_size=args.page_size)):
-        g_release = parse_iso(g.get("release_date"))
-        if not in_window(g_release, start_dt, end_dt):
-            # Skip games outside the window
-            continue
-        fetched.append(g)
+    # filter lazily so rows are written as they are fetched
+    fetched = (
+        g
+        for g in tqdm(fetch_games_api(args.start, args.end, args.api_key, page_size=args.page_size, cache_dir=None if args.no_cache else args.cache_dir))
+        if release_in_window(g.get("release_date"), start_dt, end_dt)
+    )
 
     if args.out.lower().endswith(".json"):
-        save_to_json(fetched, args.out)
+        n_saved = save_to_json(fetched, args.out)
     else:
         # choose columns
         fields = [
@@ -175,9 +267,9 @@ def main(argv: Optional[List[str]] = None) -> None:
             "metacritic",
             "description",
         ]
-        save_to_csv(fetched, args.out, fields)
+        n_saved = save_to_csv(fetched, args.out, fields)
 
-    logger.info("Saved %d RAWG records to %s", len(fetched), args.out)
+    logger.info("Saved %d RAWG records to %s", n_saved, args.out)
 
 
 if __name__ == "__main__":